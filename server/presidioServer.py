@@ -7,17 +7,39 @@ Start with:
     server\\presidio-venv\\Scripts\\python.exe server\\presidioServer.py
 """
 
+import hashlib
 import json
 import re
 import sys
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from operator import attrgetter, itemgetter
+
+try:
+    import re2  # optional (pip install google-re2) — linear-time engine for custom regex rules
+except ImportError:
+    re2 = None
+
+try:
+    import ahocorasick  # optional (pip install pyahocorasick) — single-pass text rule matching
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson  # optional (pip install orjson) — faster request/response JSON
+except ImportError:
+    orjson = None
 
 PORT = 3002
 ALLOWED_ORIGIN = "https://localhost:3000"
 
 print("[Presidio] Loading NLP model — this takes a few seconds...", flush=True)
 
-from presidio_analyzer import AnalyzerEngine, Pattern, PatternRecognizer, RecognizerResult
+from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine, Pattern, PatternRecognizer, RecognizerResult
 from presidio_analyzer.predefined_recognizers import PhoneRecognizer
 from presidio_anonymizer import AnonymizerEngine
 
@@ -60,6 +82,17 @@ ENTITY_FRIENDLY_LABEL = {
 # ── Build analyzer ────────────────────────────────────────────────────────────
 analyzer = AnalyzerEngine()
 
+# Presidio reads entities, tokens and lemmas from spaCy but never the dependency
+# parse. Tagger, attribute_ruler and lemmatizer stay on: they produce the lemmas
+# that recognizer context words ("sort code", "postcode", ...) are matched against.
+try:
+    for nlp in analyzer.nlp_engine.nlp.values():
+        if "parser" in nlp.pipe_names:
+            nlp.disable_pipe("parser")
+            print("[Presidio] spaCy parser disabled (not used for PII detection)", flush=True)
+except AttributeError:
+    pass
+
 # Step 2: Replace default PhoneRecognizer with one scoped to GB
 try:
     analyzer.registry.remove_recognizer("PhoneRecognizer")
@@ -83,19 +116,22 @@ try:
 except ImportError:
     # Not yet released on PyPI — use a custom recognizer covering all 6 valid formats
     # plus GIR 0AA. Score 0.65 catches postcodes in address blocks without context words.
+    # Each format is an atomic group: once one has matched, the engine never retries
+    # the optional space inside it and moves straight on to the next format.
+    # PatternRecognizer compiles this once with the `regex` module and caches it.
     analyzer.registry.add_recognizer(PatternRecognizer(
         supported_entity="UK_POSTCODE",
         patterns=[Pattern(
             name="uk_postcode",
             regex=(
                 r"\b("
-                r"GIR\s?0AA"                                              # Special case
-                r"|[A-PR-UWYZ][A-HK-Y][0-9]{2}\s?[0-9][ABD-HJLNP-UW-Z]{2}"   # AA99 9AA
-                r"|[A-PR-UWYZ][A-HK-Y][0-9][ABEHMNPRVWXY]\s?[0-9][ABD-HJLNP-UW-Z]{2}"  # AA9A 9AA
-                r"|[A-PR-UWYZ][A-HK-Y][0-9]\s?[0-9][ABD-HJLNP-UW-Z]{2}"  # AA9 9AA
-                r"|[A-PR-UWYZ][0-9]{2}\s?[0-9][ABD-HJLNP-UW-Z]{2}"       # A99 9AA
-                r"|[A-PR-UWYZ][0-9][ABCDEFGHJKPSTUW]\s?[0-9][ABD-HJLNP-UW-Z]{2}"  # A9A 9AA
-                r"|[A-PR-UWYZ][0-9]\s?[0-9][ABD-HJLNP-UW-Z]{2}"          # A9 9AA
+                r"(?>GIR\s?0AA)"                                              # Special case
+                r"|(?>[A-PR-UWYZ][A-HK-Y][0-9]{2}\s?[0-9][ABD-HJLNP-UW-Z]{2})"   # AA99 9AA
+                r"|(?>[A-PR-UWYZ][A-HK-Y][0-9][ABEHMNPRVWXY]\s?[0-9][ABD-HJLNP-UW-Z]{2})"  # AA9A 9AA
+                r"|(?>[A-PR-UWYZ][A-HK-Y][0-9]\s?[0-9][ABD-HJLNP-UW-Z]{2})"  # AA9 9AA
+                r"|(?>[A-PR-UWYZ][0-9]{2}\s?[0-9][ABD-HJLNP-UW-Z]{2})"       # A99 9AA
+                r"|(?>[A-PR-UWYZ][0-9][ABCDEFGHJKPSTUW]\s?[0-9][ABD-HJLNP-UW-Z]{2})"  # A9A 9AA
+                r"|(?>[A-PR-UWYZ][0-9]\s?[0-9][ABD-HJLNP-UW-Z]{2})"          # A9 9AA
                 r")\b"
             ),
             score=0.65,
@@ -104,9 +140,19 @@ except ImportError:
     ))
     print("[Presidio] UK Postcode recognizer enabled (custom)", flush=True)
 
+
+class _SortCodeRecognizer(PatternRecognizer):
+    """Dashed sort-code recognizer that skips the regex scan when the text has no '-' at all."""
+
+    def analyze(self, text, entities, nlp_artifacts=None, regex_flags=None):
+        if "-" not in text:
+            return []
+        return super().analyze(text, entities, nlp_artifacts=nlp_artifacts, regex_flags=regex_flags)
+
+
 # Step 4: UK Sort Code — dashed format (xx-xx-xx) is specific enough at 0.5 base score;
 # context words bump it further, plain digits alone stay low without context.
-analyzer.registry.add_recognizer(PatternRecognizer(
+analyzer.registry.add_recognizer(_SortCodeRecognizer(
     supported_entity="UK_SORT_CODE",
     patterns=[Pattern(
         name="uk_sort_code_dashed",
@@ -119,21 +165,318 @@ print("[Presidio] UK Sort Code recognizer enabled", flush=True)
 
 anonymizer = AnonymizerEngine()
 
+# Runs several paragraphs through spaCy's nlp.pipe in one batch
+batch_analyzer = BatchAnalyzerEngine(analyzer_engine=analyzer)
+
+# Each request runs on its own thread. spaCy does not promise thread-safe
+# inference, so analysis is serialised; parsing, custom rules and I/O overlap.
+_ANALYZER_LOCK = threading.Lock()
+
+# One throwaway analysis so spaCy and the recognizers finish their lazy set-up
+# (vocab, compiled patterns, context lemmas) before the first real request
+analyzer.analyze(text="John Smith lives at 10 Downing St.", language="en", score_threshold=SCORE_THRESHOLD)
+print("[Presidio] Analyzer warmed up", flush=True)
+
 print(f"[Presidio] Ready on http://localhost:{PORT}", flush=True)
 
 
-def _apply_custom_rules(text, rules, score_threshold):
+@dataclass(slots=True)
+class EntityInfo:
+    """One replaced occurrence, reported back to the client as {type, original, label, score}."""
+    type: str
+    original: str
+    label: str
+    score: float
+
+
+def _json_default(obj):
+    """json.dumps hook for EntityInfo (orjson serialises dataclasses natively)."""
+    if isinstance(obj, EntityInfo):
+        return {"type": obj.type, "original": obj.original, "label": obj.label, "score": obj.score}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_loads(data):
     """
-    Apply custom obfuscation rules to text using re directly, bypassing
-    Presidio's recognizer chain (which requires NLP artifacts for deny-list
-    matching and would silently fail with nlp_artifacts=None).
+    Parse a request body (bytes).
 
-    Text rules use case-insensitive literal matching at score 1.0.
-    Regex rules use the supplied pattern at the supplied score (default 0.85).
-    Returns a list of RecognizerResult objects.
+    orjson rejects lone surrogate escapes (e.g. half an emoji cut off in Word)
+    that json accepts, so those bodies are parsed again with json.
     """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def _json_dumps(payload):
+    """Serialise a response payload to UTF-8 bytes, falling back to json for lone surrogates."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(payload, default=_json_default).encode("utf-8")
+
+
+class _LruCache:
+    """Small thread-safe LRU map, bounded by entry count and optionally by total len() of its values."""
+
+    def __init__(self, maxsize, maxbytes=None):
+        self._maxsize = maxsize
+        self._maxbytes = maxbytes
+        self._nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self._maxbytes is not None and len(value) > self._maxbytes:
+            return  # would evict everything else and still not fit
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None and self._maxbytes is not None:
+                self._nbytes -= len(old)
+            self._data[key] = value
+            if self._maxbytes is not None:
+                self._nbytes += len(value)
+            while len(self._data) > self._maxsize or (
+                self._maxbytes is not None and self._nbytes > self._maxbytes
+            ):
+                _, evicted = self._data.popitem(last=False)
+                if self._maxbytes is not None:
+                    self._nbytes -= len(evicted)
+
+
+def _digest(data):
+    """Compact cache key for request content, so caches don't hold document text."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+# (digest of text block, language) -> tuple of RecognizerResult
+_analysis_cache = _LruCache(maxsize=256)
+
+# digest of the raw request body -> encoded 200 response. Unlike the analysis cache,
+# responses include each original entity next to its label, so this holds document
+# text in memory until evicted or the service restarts. Capped by size as well as
+# count, since one response can carry a whole document.
+_response_cache = _LruCache(maxsize=128, maxbytes=4 * 1024 * 1024)
+
+
+# A blank line in any newline convention — Word separates paragraphs with \r
+_PARAGRAPH_BREAK = re.compile(r"(?:\r\n|\r|\n)[ \t]*(?:\r\n|\r|\n)")
+
+# Any letter or digit in any script — text without one cannot contain a detectable entity
+_HAS_PII_CANDIDATES = re.compile(r"[^\W_]")
+
+
+def _analyze_cached(text, language):
+    """
+    Run the Presidio analyzer block by block, reusing results for blocks analysed recently.
+
+    The text is split at blank lines and each block is cached on its own, so
+    re-submitting a document after editing one paragraph only re-analyses that
+    paragraph. Blocks that miss the cache go through spaCy together in one
+    nlp.pipe batch. Context words only boost matches inside their own block.
+
+    Returns a new list with offsets relative to text; callers may extend it.
+    """
+    blocks = []  # (offset in text, block text)
+    start = 0
+    for m in _PARAGRAPH_BREAK.finditer(text):
+        blocks.append((start, text[start:m.start()]))
+        start = m.end()
+    blocks.append((start, text[start:]))
+    blocks = [(offset, block) for offset, block in blocks if _HAS_PII_CANDIDATES.search(block)]
+
+    keys = [(_digest(block.encode("utf-8")), language) for _, block in blocks]
+    block_results = [_analysis_cache.get(key) for key in keys]
+    misses = [i for i, cached in enumerate(block_results) if cached is None]
+    if misses:
+        with _ANALYZER_LOCK:
+            analysed = batch_analyzer.analyze_iterator(
+                texts=[blocks[i][1] for i in misses],
+                language=language,
+                batch_size=32,
+                score_threshold=SCORE_THRESHOLD,
+            )
+        for i, found in zip(misses, analysed):
+            block_results[i] = tuple(found)
+            _analysis_cache.put(keys[i], block_results[i])
+
+    # Cached results are shared between requests — shift copies, never the originals
     results = []
-    for rule in rules:
+    for (offset, _), found in zip(blocks, block_results):
+        if offset == 0:
+            results.extend(found)
+            continue
+        for r in found:
+            results.append(RecognizerResult(
+                entity_type=r.entity_type, start=r.start + offset, end=r.end + offset, score=r.score,
+                analysis_explanation=r.analysis_explanation,
+                recognition_metadata=r.recognition_metadata,
+            ))
+    return results
+
+
+@lru_cache(maxsize=512)
+def _compile_text(value):
+    """Compiled case-insensitive literal matcher for a text rule, reused across requests."""
+    return re.compile(re.escape(value), re.IGNORECASE)
+
+
+# Constructs RE2 reads differently from re: its \d \w \s \b classes are ASCII-only,
+# $ doesn't match before a trailing newline, [[:alpha:]] is a POSIX class, {,n} is
+# literal text rather than {0,n}, and its case folding under (?i) isn't re's.
+# Patterns containing any of them stay on re.
+_RE2_DIALECT_DIFF = re.compile(r"\\[dDwWsSbB]|\$|\[:|\{,|\(\?[a-zA-Z]*i")
+
+# Patterns RE2 rejects fall back to re quietly instead of logging to the console
+if re2 is not None:
+    _RE2_OPTIONS = re2.Options()
+    _RE2_OPTIONS.log_errors = False
+
+
+@lru_cache(maxsize=512)
+def _compile_regex(pattern_str):
+    """
+    Compiled pattern for a regex rule, reused across requests.
+
+    When RE2 is installed, patterns that mean the same thing in both engines
+    go through it, so a pathological rule cannot backtrack exponentially.
+    Everything else, including patterns RE2 rejects (backreferences,
+    lookarounds), stays on re. Patterns re rejects raise re.error as before.
+    """
+    compiled = re.compile(pattern_str)
+    if re2 is not None and not _RE2_DIALECT_DIFF.search(pattern_str):
+        try:
+            return re2.compile(pattern_str, _RE2_OPTIONS)
+        except Exception:
+            pass
+    return compiled
+
+
+def _match_text_rules(text, text_lower, text_rules):
+    """
+    Find case-insensitive literal occurrences for a list of (rule index, findText, entity).
+
+    Literals are searched in text_lower (text.lower(), computed once per request):
+    with pyahocorasick installed all of them in one pass, otherwise one str.find
+    scan per rule (C-level substring search, no regex engine). Either way each
+    literal's occurrences are non-overlapping, as with re.finditer; overlaps
+    between different literals are left for _remove_overlaps. If lowercasing
+    changes the text length the offsets would no longer line up, so re matches
+    against the original instead.
+
+    Returns (rule index, RecognizerResult) pairs.
+    """
+    results = []
+    if len(text_lower) != len(text):
+        for index, value, entity in text_rules:
+            for m in _compile_text(value).finditer(text):
+                results.append((index, RecognizerResult(
+                    entity_type=entity, start=m.start(), end=m.end(), score=1.0
+                )))
+        return results
+
+    if ahocorasick is not None:
+        needles = {}  # lowercased literal -> [(rule index, entity), ...]
+        for index, value, entity in text_rules:
+            needles.setdefault(value.lower(), []).append((index, entity))
+        automaton = ahocorasick.Automaton()
+        for needle, targets in needles.items():
+            automaton.add_word(needle, (needle, len(needle), targets))
+        automaton.make_automaton()
+        # Hits arrive in end order; like str.find, resume each literal after its last hit
+        last_end = {}  # lowercased literal -> end of its last reported hit
+        for end, (needle, length, targets) in automaton.iter(text_lower):
+            start = end - length + 1
+            if start < last_end.get(needle, 0):
+                continue
+            last_end[needle] = end + 1
+            for index, entity in targets:
+                results.append((index, RecognizerResult(
+                    entity_type=entity, start=start, end=end + 1, score=1.0
+                )))
+        return results
+
+    for index, value, entity in text_rules:
+        needle = value.lower()
+        pos = text_lower.find(needle)
+        while pos >= 0:
+            results.append((index, RecognizerResult(
+                entity_type=entity, start=pos, end=pos + len(needle), score=1.0
+            )))
+            pos = text_lower.find(needle, pos + len(needle))
+    return results
+
+
+# Backreferences and numbered conditionals (?(1)...) refer to groups numbered per
+# pattern, and would point at the wrong group once joined
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(\d")
+
+
+def _match_regex_rules(text, regex_rules):
+    """
+    Run (rule index, pattern, compiled, entity, score) regex rules over text.
+
+    All patterns are first joined into one alternation and searched once. Most
+    rules match nothing in a given document, so a miss skips every per-rule scan;
+    on a hit the per-rule scans start from the earliest match, as no rule can
+    match before it. The per-rule scans are kept because an alternation reports
+    only one rule per position, and overlap removal needs every rule's matches.
+
+    Returns (rule index, RecognizerResult) pairs.
+    """
+    pos = 0
+    patterns = list(dict.fromkeys(p for _, p, _, _, _ in regex_rules))
+    if len(patterns) > 1 and not any(_BACKREFERENCE.search(p) for p in patterns):
+        try:
+            joined = _compile_regex("|".join(f"(?:{p})" for p in patterns))
+        except re.error:
+            pass  # e.g. two rules reuse a group name — scan per rule
+        else:
+            # Only trust a miss if the joined pattern runs on the same engine as every rule
+            if all(type(compiled) is type(joined) for _, _, compiled, _, _ in regex_rules):
+                first = joined.search(text)
+                if first is None:
+                    return []
+                pos = first.start()
+
+    results = []
+    for index, _, compiled, entity, score in regex_rules:
+        for m in compiled.finditer(text, pos):
+            results.append((index, RecognizerResult(
+                entity_type=entity, start=m.start(), end=m.end(), score=score
+            )))
+    return results
+
+
+def _apply_custom_rules(text, text_lower, rules, score_threshold):
+    """
+    Apply custom obfuscation rules to text directly, bypassing Presidio's
+    recognizer chain (which requires NLP artifacts for deny-list matching and
+    would silently fail with nlp_artifacts=None).
+
+    Text rules use case-insensitive literal matching at score 1.0, via
+    Aho-Corasick when available and str.find otherwise.
+    Regex rules use the supplied pattern at the supplied score (default 0.85),
+    compiled with RE2 where its semantics match re and with re otherwise.
+    Returns a list of RecognizerResult objects in rule order.
+    """
+    # Dicts keyed by what a rule matches and emits, so duplicate rules (common when
+    # config and session rules overlap) cost one scan between them
+    text_rules = {}   # (findText lowercased, entity) -> (rule index, first findText as written)
+    regex_rules = {}  # (pattern, entity, score) -> (rule index, compiled pattern)
+    for index, rule in enumerate(rules):
         match_type = rule.get("match", "")
         entity = rule.get("replaceText", "")
         if not match_type or not entity:
@@ -142,42 +485,65 @@ def _apply_custom_rules(text, rules, score_threshold):
             value = rule.get("findText", "")
             if not value:
                 continue
-            try:
-                for m in re.finditer(re.escape(value), text, re.IGNORECASE):
-                    results.append(RecognizerResult(
-                        entity_type=entity, start=m.start(), end=m.end(), score=1.0
-                    ))
-            except re.error:
-                pass
+            text_rules.setdefault((value.lower(), entity), (index, value))
         elif match_type == "regex":
             pattern_str = rule.get("pattern", "")
             if not pattern_str:
                 continue
             score = float(rule.get("score", 0.85))
+            key = (pattern_str, entity, score)
+            if score < score_threshold or key in regex_rules:
+                continue
             try:
-                for m in re.finditer(pattern_str, text):
-                    if score >= score_threshold:
-                        results.append(RecognizerResult(
-                            entity_type=entity, start=m.start(), end=m.end(), score=score
-                        ))
+                regex_rules[key] = (index, _compile_regex(pattern_str))
             except re.error:
                 pass
-    return results
+    tagged = []  # (rule index, RecognizerResult)
+    if regex_rules:
+        tagged.extend(_match_regex_rules(text, [
+            (index, p, compiled, entity, score)
+            for (p, entity, score), (index, compiled) in regex_rules.items()
+        ]))
+    if text_rules:
+        tagged.extend(_match_text_rules(text, text_lower, [
+            (index, value, entity) for (_, entity), (index, value) in text_rules.items()
+        ]))
+    # Back into rule order: _remove_overlaps breaks equal-score, equal-length ties
+    # by input order, so the earlier rule must come first whatever matched it
+    tagged.sort(key=itemgetter(0))
+    return [r for _, r in tagged]
+
+
+# C-level sort key, no Python frame per element. Ends break ties so a zero-length
+# match sorts before a span starting at the same offset and the cursor never rewinds.
+_by_position = attrgetter("start", "end")
 
 
 def _remove_overlaps(results):
-    """Remove overlapping entities, keeping the highest-confidence match per region."""
+    """
+    Remove overlapping entities, keeping the highest-confidence match per region.
+
+    Candidates are visited best-first (score, then length). Kept spans never
+    overlap, so they stay ordered by both start and end — a bisect on their
+    starts finds the one neighbour that could clash with a new candidate in
+    O(log n) instead of checking every kept span. Inserting a kept span is
+    still an O(k) list shift, but it is a single C-level memmove.
+    """
     sorted_r = sorted(results, key=lambda x: (-x.score, -(x.end - x.start)))
     kept = []
-    covered = []
+    kept_starts = []  # kept spans ordered by start
+    kept_ends = []    # ends of the same spans, in the same order
     for r in sorted_r:
-        if not any(r.start < end and r.end > start for start, end in covered):
-            kept.append(r)
-            covered.append((r.start, r.end))
+        i = bisect_left(kept_starts, r.end)
+        if i and kept_ends[i - 1] > r.start:
+            continue
+        kept_starts.insert(i, r.start)
+        kept_ends.insert(i, r.end)
+        kept.append(r)
     return kept
 
 
-def _anonymize_consistent(text, results, custom_replacements=None, operator="replace"):
+def _anonymize_consistent(text, text_lower, results, custom_replacements=None, operator="replace"):
     """
     Replace detected entities with consistent labels per type.
 
@@ -195,56 +561,66 @@ def _anonymize_consistent(text, results, custom_replacements=None, operator="rep
       - "mask"    -> "*" * len(original)
       - "hash"    -> first 12 hex chars of SHA-256 of original
 
-    Returns (anonymised_text, entities) where entities is a list of
+    Returns (anonymised_text, entities) where entities is a list of EntityInfo
     {type, original, label, score} — one entry per occurrence, in document order.
-    The label_map is discarded after the request; the output cannot be reversed.
+    The anonymised text alone cannot be reversed, but entities pairs every label
+    with its original, and do_POST keeps the encoded response in _response_cache.
     """
     if custom_replacements is None:
         custom_replacements = {}
 
     clean = _remove_overlaps(results)
-    clean_sorted = sorted(clean, key=lambda x: x.start)
+    clean_sorted = sorted(clean, key=_by_position)
+    # Slice keys out of the request-wide lowercase copy unless lowercasing shifted offsets
+    aligned = len(text_lower) == len(text)
 
     counters = {}   # entity_type -> int
     label_map = {}  # (entity_type, original_lower) -> label
+    friendly_label = ENTITY_FRIENDLY_LABEL.get
 
     entity_info = []
 
+    # One left-to-right pass: each span is sliced and keyed once, used for both
+    # the label lookup and the output, which is joined once at the end
+    parts = []
+    cursor = 0
     for r in clean_sorted:
         original = text[r.start:r.end]
-        key = (r.entity_type, original.lower().strip())
-        if key not in label_map:
+        folded = text_lower[r.start:r.end] if aligned else original.lower()
+        key = (r.entity_type, folded.strip())
+        label = label_map.get(key)
+        if label is None:
             repl = custom_replacements.get(r.entity_type)
             if repl == "mask":
-                label_map[key] = "*" * len(original)
+                label = "*" * len(original)
             elif repl:
-                label_map[key] = repl
+                label = repl
             elif operator == "redact":
-                label_map[key] = " " * len(original)
+                label = " " * len(original)
             elif operator == "mask":
-                label_map[key] = "*" * len(original)
+                label = "*" * len(original)
             else:  # "replace" (default)
                 counters[r.entity_type] = counters.get(r.entity_type, 0) + 1
-                friendly = ENTITY_FRIENDLY_LABEL.get(r.entity_type, r.entity_type)
-                label_map[key] = f"<{friendly}_{counters[r.entity_type]}>"
-        entity_info.append({
-            "type": r.entity_type,
-            "original": original,
-            "label": label_map[key],
-            "score": round(r.score, 3),
-        })
-
-    # Replace from right to left so earlier offsets stay valid
-    anonymised = text
-    for r in sorted(clean, key=lambda x: x.start, reverse=True):
-        original = text[r.start:r.end]
-        key = (r.entity_type, original.lower().strip())
-        anonymised = anonymised[:r.start] + label_map[key] + anonymised[r.end:]
+                label = f"<{friendly_label(r.entity_type, r.entity_type)}_{counters[r.entity_type]}>"
+            label_map[key] = label
+        entity_info.append(EntityInfo(r.entity_type, original, label, round(r.score, 3)))
+        parts.append(text[cursor:r.start])
+        parts.append(label)
+        cursor = r.end
+    parts.append(text[cursor:])
 
-    return anonymised, entity_info
+    return "".join(parts), entity_info
 
 
 class Handler(BaseHTTPRequestHandler):
+    # Keep-alive: the task pane reuses one connection instead of reconnecting per call.
+    # Every response must therefore carry Content-Length (or close the connection).
+    protocol_version = "HTTP/1.1"
+    # Seconds an idle keep-alive connection may hold its server thread before it is closed
+    timeout = 30
+    # Buffer writes so headers and body leave in one send when handle_one_request
+    # flushes — two small writes on a reused connection stall on the delayed ACK
+    wbufsize = -1
 
     def do_OPTIONS(self):
         """Handle CORS preflight."""
@@ -254,18 +630,36 @@ class Handler(BaseHTTPRequestHandler):
 
     def do_POST(self):
         if self.path != "/anonymize":
+            # The request body is left unread, so this connection can't be reused
             self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.send_header("Connection", "close")
             self.end_headers()
             return
 
         try:
             length = int(self.headers.get("Content-Length", 0))
-            body = json.loads(self.rfile.read(length))
+            raw = self.rfile.read(length)
+
+            # An identical body (same text, language, rules and operator) always gets
+            # the same answer — resend it without parsing or anonymising again
+            cache_key = _digest(raw)
+            cached = _response_cache.get(cache_key)
+            if cached is not None:
+                self._send_body(200, cached)
+                return
+
+            body = _json_loads(raw)
             text = body.get("text", "")
             language = body.get("language", "en")
             custom_rules = body.get("custom_rules", [])
             operator = body.get("operator", "replace")
 
+            if not text.strip():
+                self._send_json(200, {"text": text, "entities": []})
+                return
+            text_lower = text.lower()  # shared by custom rules and label keys
+
             # Build replacement map for custom rules that specify a replacement string
             custom_replacements = {
                 rule["replaceText"]: rule["replacement"]
@@ -273,24 +667,37 @@ class Handler(BaseHTTPRequestHandler):
                 if rule.get("replaceText") and rule.get("replacement") is not None
             }
 
-            results = analyzer.analyze(text=text, language=language, score_threshold=SCORE_THRESHOLD)
+            # Text with no letters or digits (rules, dividers, numbering) has nothing
+            # for the NLP pipeline to find — only custom rules can still match it
+            if _HAS_PII_CANDIDATES.search(text):
+                results = _analyze_cached(text, language)
+            else:
+                results = []
 
-            # Apply custom rules via re — no NLP artifacts required
-            results.extend(_apply_custom_rules(text, custom_rules, SCORE_THRESHOLD))
+            # Apply custom rules directly — no NLP artifacts required
+            results.extend(_apply_custom_rules(text, text_lower, custom_rules, SCORE_THRESHOLD))
 
-            anonymised_text, entities = _anonymize_consistent(text, results, custom_replacements, operator)
+            anonymised_text, entities = _anonymize_consistent(text, text_lower, results, custom_replacements, operator)
 
-            self._send_json(200, {"text": anonymised_text, "entities": entities})
+            response = _json_dumps({"text": anonymised_text, "entities": entities})
+            _response_cache.put(cache_key, response)
+            self._send_body(200, response)
 
         except Exception as e:
+            self.close_connection = True  # the body may not have been fully read
             self._send_json(500, {"error": str(e)})
 
     def _send_json(self, status: int, payload: dict):
-        body = json.dumps(payload).encode("utf-8")
+        self._send_body(status, _json_dumps(payload))
+
+    def _send_body(self, status: int, body: bytes):
+        """Send an already-encoded JSON body."""
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(body)))
         self._cors_headers()
+        if self.close_connection:
+            self.send_header("Connection", "close")
         self.end_headers()
         self.wfile.write(body)
 
@@ -305,7 +712,7 @@ class Handler(BaseHTTPRequestHandler):
 
 if __name__ == "__main__":
     try:
-        server = HTTPServer(("localhost", PORT), Handler)
+        server = ThreadingHTTPServer(("localhost", PORT), Handler)
         server.serve_forever()
     except KeyboardInterrupt:
         print("\n[Presidio] Stopped.", flush=True)